@@ -1,24 +1,40 @@
+import functools
+import os
+
 import numpy as np
 import pandas as pd
 from matplotlib import pyplot as plt
 
 
+def _is_fresh(cache_fn: str, source_fn: str) -> bool:
+    """Whether the cache file exists and is at least as new as its source file"""
+    return os.path.exists(cache_fn) and os.path.getmtime(cache_fn) >= os.path.getmtime(source_fn)
+
+
+@functools.lru_cache(maxsize=1)
 def read_power_price():
     """
     Reads power price data from 'spotpriser.xlsx'.
     Converts the date strings to datetime and sets it as index.
     Returns a Series with power prices indexed by datetime.
+
+    The parsed prices are saved to 'spotpriser.parquet', which is read instead of the
+    Excel file on later runs unless the Excel file is newer.
+    The result is cached, so copy it before modifying it in place.
     """
+    if _is_fresh("spotpriser.parquet", "spotpriser.xlsx"):
+        return pd.read_parquet("spotpriser.parquet")["NO1"]
+
     # Read the Excel file
-    df = pd.read_excel("spotpriser.xlsx")
+    df = pd.read_excel("spotpriser.xlsx", engine="calamine")
 
-    # Convert the date-time strings to datetime objects
-    df["date"] = df["Dato/klokkeslett"].str.replace(r"[Kk][Ll]\.|\-|\s+", "", regex=True)
-    # Discard the last two characters before conversion
-    df["date"] = pd.to_datetime(df["date"].str[:-2], format="%Y%m%d%H")
+    # Convert the date-time strings, e.g. "2022-01-01 Kl. 00-01", to datetime objects
+    # Discard the end of the hour interval before conversion
+    df["date"] = pd.to_datetime(df["Dato/klokkeslett"].str[:-3], format="%Y-%m-%d Kl. %H")
 
     # Set the datetime column as index and select the price column
     price_series = df.set_index("date")["NO1"]
+    price_series.to_frame().to_parquet("spotpriser.parquet")
 
     return price_series
 
@@ -31,14 +47,24 @@ def extract_consumption():
     df = df.set_index(pd.to_datetime(df["START_TIME"], utc=True))
     df = df["QUANTITY_KWH"]
     df.to_csv("consumption.csv")  # Save to CSV for later use
+    df.to_frame().to_parquet("consumption.parquet")  # and as parquet for faster reading
     return df
 
 
+@functools.lru_cache
 def read_consumption(year: str = "2022", total: float = 25_000):
-    """Average household consumption in kWh"""
-    df = pd.read_csv("consumption.csv")
-    # df["date"] = pd.to_datetime(df["START_TIME"], utc=True)
-    df.set_index(pd.to_datetime(df["START_TIME"], utc=True), inplace=True)
+    """
+    Average household consumption in kWh
+    Reads 'consumption.parquet' if it is up to date, otherwise parses 'consumption.csv' and saves it as parquet.
+    The result is cached, so copy it before modifying it in place.
+    """
+    if _is_fresh("consumption.parquet", "consumption.csv"):
+        df = pd.read_parquet("consumption.parquet")
+    else:
+        df = pd.read_csv("consumption.csv")
+        # df["date"] = pd.to_datetime(df["START_TIME"], utc=True)
+        df = df.set_index(pd.to_datetime(df["START_TIME"], utc=True))[["QUANTITY_KWH"]]
+        df.to_parquet("consumption.parquet")
     df = df.loc[year]["QUANTITY_KWH"]
     # Normalize to match the total consumption requested
     df = df * (total / df.sum())
@@ -49,10 +75,12 @@ def read_consumption(year: str = "2022", total: float = 25_000):
     return df
 
 
+@functools.lru_cache
 def read_production(year: str = "2020", yearly_average: float = 23_000):
     """
     Reads solar production data from Excel file and converts it to a time series.
     Returns a pandas Series with hourly production values (kWh) indexed by datetime.
+    The result is cached, so copy it before modifying it in place.
 
     Parameters:
     -----------
@@ -63,35 +91,15 @@ def read_production(year: str = "2020", yearly_average: float = 23_000):
     fn = "GSA_Report_Ås_Norway.xlsx"
 
     # Read the Excel file containing hourly production profiles
-    df = pd.read_excel(fn, sheet_name="Hourly_profiles", skiprows=4, nrows=24, usecols=range(1, 13))
-
-    # Assuming the data has hours as rows and months/days as columns
-    # Restructure the data into a single time series
-
-    # Get hourly profiles for a typical day of each month
-    monthly_profiles = {}
-    for month in range(12):  # 1-12 months
-        month_profile = []
-        for hour in range(24):  # 0-23 hours
-            value = df.iloc[hour, month]
-            month_profile.append(value)
+    df = pd.read_excel(fn, sheet_name="Hourly_profiles", skiprows=4, nrows=24, usecols=range(1, 13), engine="calamine")
 
-        # Store the 24-hour profile for this month
-        monthly_profiles[month] = month_profile
+    # The data has hours as rows and months as columns: the hourly profile of a typical day of each month
+    monthly_profiles = df.to_numpy().T  # shape (12 months, 24 hours)
 
     # Create a time series for the full year by repeating the daily profile for each day of the month
     full_year_idx = pd.date_range(f"{year}-01-01", f"{int(year) + 1}-01-01", freq="h", inclusive="left")
-    production_values = []
-
-    for timestamp in full_year_idx:
-        month = timestamp.month
-        hour = timestamp.hour
-
-        # Repeat the same daily profile for all days in the month
-        value = monthly_profiles[month - 1][hour]
-        production_values.append(value)
+    production_values = monthly_profiles[full_year_idx.month - 1, full_year_idx.hour]
 
-    # Create a Series from the collected data
     series = pd.Series(production_values, index=full_year_idx)
 
     return series / series.sum() * yearly_average
@@ -186,8 +194,8 @@ def compare_actual_consumption_to_average():
 
 
 def apparent_adoption_factor(adoption_factor, year):
-    date_range = pd.date_range(f"{year}-01-01", f"{int(year) + 1}-01-01", freq="MS", inclusive="both")
-    series = pd.DataFrame(np.append(adoption_factor, np.nan), index=date_range)
-    series = series.resample("h").ffill()
-    series = series.loc[year]
+    """Expand the 12 monthly adoption factors to an hourly Series for the given year"""
+    date_range = pd.date_range(f"{year}-01-01", f"{int(year) + 1}-01-01", freq="h", inclusive="left")
+    hours_per_month = np.bincount(date_range.month, minlength=13)[1:]
+    series = pd.Series(np.repeat(np.asarray(adoption_factor, dtype=float), hours_per_month), index=date_range)
     return series